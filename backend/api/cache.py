@@ -0,0 +1,55 @@
+import json
+import time
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.versions import get_version
+
+RESPONSE_CACHE_KEY = "response:{}"
+RESPONSE_LOCK_KEY = "response_lock:{}"
+
+
+def get_response_key(request, version_names):
+    params = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    return RESPONSE_CACHE_KEY.format(
+        sha1(
+            json.dumps(
+                [
+                    request.get_host(),
+                    request.path,
+                    params,
+                    [get_version(name) for name in version_names],
+                ]
+            ).encode()
+        ).hexdigest()
+    )
+
+
+def get_cached_response(request, version_names, get_response):
+    key = get_response_key(request, version_names)
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+    lock_key = RESPONSE_LOCK_KEY.format(key)
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return get_response()
+        time.sleep(settings.RESPONSE_CACHE_WAIT)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+    try:
+        response = get_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return response
@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.models import ShoppingCartIngredient, ShoppingListExport
+from .pdf import get_cart_version, get_lines
+from .utils import EXPORTS
+
+executor = ThreadPoolExecutor(max_workers=settings.EXPORT_WORKERS)
+
+
+def write_response(response, file):
+    if response.streaming:
+        for chunk in response.streaming_content:
+            file.write(chunk)
+    else:
+        file.write(response.content)
+    response.close()
+
+
+def run_export(job_id):
+    job = ShoppingListExport.objects.get(id=job_id)
+    job.status = ShoppingListExport.Status.RUNNING
+    job.save(update_fields=["status"])
+    try:
+        response = EXPORTS[job.format](
+            ShoppingCartIngredient.objects.get_ingredient_list(job.user)
+        )
+        name = f"exports/{uuid4().hex}.{job.format}"
+        path = job.file.storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            write_response(response, file)
+        job.file.name = name
+        job.status = ShoppingListExport.Status.DONE
+    except Exception:
+        job.status = ShoppingListExport.Status.FAILED
+    finally:
+        job.save(update_fields=["status", "file"])
+        connection.close()
+
+
+def get_expired():
+    return ShoppingListExport.objects.filter(
+        created__lt=timezone.now() - timedelta(seconds=settings.EXPORT_TTL)
+    )
+
+
+def delete_expired():
+    for job in get_expired():
+        job.file.delete(save=False)
+        job.delete()
+
+
+def fail_stale():
+    return ShoppingListExport.objects.filter(
+        status__in=[
+            ShoppingListExport.Status.PENDING,
+            ShoppingListExport.Status.RUNNING,
+        ],
+        created__lt=(
+            timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+        ),
+    ).update(status=ShoppingListExport.Status.FAILED)
+
+
+def delete_orphaned():
+    storage = ShoppingListExport._meta.get_field("file").storage
+    if not storage.exists("exports"):
+        return 0
+    names = set(
+        ShoppingListExport.objects.exclude(file="").values_list(
+            "file", flat=True
+        )
+    )
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_TTL)
+    deleted = 0
+    for filename in storage.listdir("exports")[1]:
+        name = f"exports/{filename}"
+        if name not in names and storage.get_modified_time(name) < cutoff:
+            storage.delete(name)
+            deleted += 1
+    return deleted
+
+
+def get_or_create_export(user, export_format):
+    delete_expired()
+    fail_stale()
+    version = get_cart_version(
+        get_lines(ShoppingCartIngredient.objects.get_ingredient_list(user))
+    )
+    job = (
+        ShoppingListExport.objects.filter(
+            user=user, format=export_format, version=version
+        )
+        .exclude(status=ShoppingListExport.Status.FAILED)
+        .first()
+    )
+    if job is not None:
+        return job, False
+    job = ShoppingListExport.objects.create(
+        user=user, format=export_format, version=version
+    )
+    transaction.on_commit(lambda: executor.submit(run_export, job.id))
+    return job, True
@@ -1,7 +1,16 @@
 from django_filters.rest_framework import FilterSet
 from django_filters import rest_framework
+from django.db.models import Case, Exists, F, OuterRef, Q, When
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import (
+    TAGS_MASK_BITS,
+    Ingredient,
+    Recipe,
+    Tag,
+    get_tags_mask,
+)
+from recipes.fulltext import search_recipes
+from recipes.search import ingredient_index
 
 
 class RecipeFilter(FilterSet):
@@ -12,20 +21,45 @@ class RecipeFilter(FilterSet):
         field_name="tags__slug",
         to_field_name="slug",
         queryset=Tag.objects.all(),
+        method="filter_tags",
     )
     is_favorited = rest_framework.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = rest_framework.BooleanFilter(
         method="filter_is_in_shopping_cart",
     )
+    search = rest_framework.CharFilter(method="filter_search")
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = {tag.id for tag in value}
+        condition = Q()
+        mask = get_tags_mask(tag_ids)
+        if mask:
+            queryset = queryset.alias(tags_match=F("tags_mask").bitand(mask))
+            condition |= ~Q(tags_match=0)
+        extra_tag_ids = {
+            tag_id for tag_id in tag_ids if tag_id >= TAGS_MASK_BITS
+        }
+        if extra_tag_ids:
+            condition |= Q(
+                Exists(
+                    Recipe.tags.through.objects.filter(
+                        recipe_id=OuterRef("pk"), tag_id__in=extra_tag_ids
+                    )
+                )
+            )
+        return queryset.filter(condition)
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorite__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_list__user=self.request.user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
     class Meta:
@@ -41,7 +75,14 @@ class IngredientFilter(FilterSet):
         field_name="name",
         lookup_expr="istartswith",
     )
+    search = rest_framework.CharFilter(method="filter_search")
+
+    def filter_search(self, queryset, name, value):
+        ids = [ingredient.id for ingredient in ingredient_index.search(value)]
+        return queryset.filter(id__in=ids).order_by(
+            Case(*[When(id=id, then=rank) for rank, id in enumerate(ids)])
+        )
 
     class Meta:
         model = Ingredient
-        fields = ("name",)
+        fields = ("name", "search")
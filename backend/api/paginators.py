@@ -1,5 +1,174 @@
+import json
+from datetime import datetime
+from functools import partial
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+from recipes.versions import get_version
+
+COUNT_CACHE_KEY = "count:{}"
+
+
+def get_estimate(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CachedCountDjangoPaginator(DjangoPaginator):
+    def __init__(self, *args, count_key, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        count = cache.get(self.count_key)
+        if count is None:
+            count = get_estimate(self.object_list)
+            if count is None or count < settings.COUNT_ESTIMATE_THRESHOLD:
+                count = super().count
+            cache.set(self.count_key, count, settings.COUNT_CACHE_TIMEOUT)
+        return count
 
 
 class CustomPaginator(pagination.PageNumberPagination):
     page_size_query_param = "limit"
+
+
+class TrendingPaginator(CustomPaginator):
+    page_size = 6
+    max_page_size = 100
+
+
+class CachedCountPaginator(CustomPaginator):
+    count_version = None
+    user_query_params = ()
+    ignored_query_params = ("page", "limit", "format")
+
+    def get_count_key(self, request, view):
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key not in self.ignored_query_params
+        )
+        versions = [get_version(self.count_version or request.path)]
+        if request.user.is_authenticated and any(
+            key in request.query_params for key in self.user_query_params
+        ):
+            versions.append(request.user.id)
+            versions.append(get_version(f"user:{request.user.id}"))
+        signature = json.dumps(
+            [request.path, params, versions], ensure_ascii=False
+        )
+        return COUNT_CACHE_KEY.format(sha1(signature.encode()).hexdigest())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CachedCountDjangoPaginator,
+            count_key=self.get_count_key(request, view),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipeCursorPaginator(pagination.CursorPagination):
+    page_size = 6
+    page_size_query_param = "limit"
+    max_page_size = 100
+    ordering = ("-created", "-id")
+
+    def get_position(self, instance):
+        return f"{instance.created.isoformat()}|{instance.pk}"
+
+    def parse_position(self, position):
+        try:
+            created, pk = position.split("|")
+            return datetime.fromisoformat(created), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if reverse:
+            queryset = queryset.order_by("created", "id")
+        else:
+            queryset = queryset.order_by("-created", "-id")
+        if self.cursor is not None and self.cursor.position is not None:
+            created, pk = self.parse_position(self.cursor.position)
+            if reverse:
+                queryset = queryset.filter(created__gte=created).exclude(
+                    created=created, id__lte=pk
+                )
+            else:
+                queryset = queryset.filter(created__lte=created).exclude(
+                    created=created, id__gte=pk
+                )
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        has_position = (
+            self.cursor is not None and self.cursor.position is not None
+        )
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_position, has_more
+        else:
+            self.has_next, self.has_previous = has_more, has_position
+        return self.page
+
+    def get_link(self, reverse):
+        if self.page:
+            instance = self.page[0] if reverse else self.page[-1]
+            position = self.get_position(instance)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(
+            pagination.Cursor(offset=0, reverse=reverse, position=position)
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_link(reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.get_link(reverse=True)
+
+
+class RecipePaginator(CachedCountPaginator):
+    cursor_paginator = None
+    count_version = "recipes"
+    user_query_params = ("is_favorited", "is_in_shopping_cart")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if RecipeCursorPaginator.cursor_query_param in request.query_params:
+            self.cursor_paginator = RecipeCursorPaginator()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from hashlib import sha1
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FONT_NAME = "Times"
+CACHE_KEY = "shopping_list_pdf:{}"
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    pdfmetrics.registerFont(
+        TTFont(
+            FONT_NAME,
+            f"{settings.BASE_DIR}/fonts/timesnewromanpsmt.ttf", "UTF-8"
+        )
+    )
+
+
+def get_lines(ingredient_list):
+    return [
+        f"{ingredient['total_amount']} "
+        f"{ingredient['ingredient__measurement_unit']}. "
+        f"{ingredient['ingredient__name']}"
+        for ingredient in ingredient_list
+    ]
+
+
+def render_pdf(lines):
+    register_font()
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer)
+    p.setFont(FONT_NAME, settings.FONT)
+    p.drawString(
+        settings.STRING_TITLE_X, settings.STRING_TITLE_Y, "Список ингредиентов"
+    )
+
+    y = settings.STRING_CONTENT_Y
+    for line in lines:
+        if y < settings.STRING_CONTENT_MIN_Y:
+            p.showPage()
+            p.setFont(FONT_NAME, settings.FONT)
+            y = settings.STRING_TITLE_Y
+        p.drawString(settings.STRING_CONTENT_X, y, line)
+        y -= settings.LINE_OFFSET_CONTENT
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def get_cart_version(lines):
+    return sha1("\n".join(lines).encode()).hexdigest()
+
+
+def get_cached_pdf(ingredient_list):
+    lines = get_lines(ingredient_list)
+    key = CACHE_KEY.format(get_cart_version(lines))
+    content = cache.get(key)
+    if content is None:
+        content = render_pdf(lines)
+        cache.set(key, content, settings.SHOPPING_LIST_CACHE_TIMEOUT)
+    return content
@@ -0,0 +1,37 @@
+from rest_framework import renderers
+
+
+class FileRenderer(renderers.BaseRenderer):
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        json_renderer = renderers.JSONRenderer()
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = json_renderer.media_type
+        return json_renderer.render(data)
+
+
+class PDFRenderer(FileRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+
+
+class CSVRenderer(FileRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class TXTRenderer(FileRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+
+class XLSXRenderer(FileRenderer):
+    media_type = (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    format = "xlsx"
@@ -5,6 +5,9 @@ from djoser.serializers import (
 )
 from rest_framework.validators import UniqueTogetherValidator
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 
 from users.models import Following
 from recipes.models import (
@@ -14,7 +17,9 @@ from recipes.models import (
     RecipeIngredient,
     Favorite,
     ShoppingList,
+    ShoppingListExport,
 )
+from recipes.signals import recipe_ingredients_changed, recipe_tags_changed
 from .validators import (
     check_following,
     ingredients_validator,
@@ -63,6 +68,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
@@ -143,17 +150,26 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
         return request.user.favorite.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
         return request.user.shopping_list.filter(recipe=obj).exists()
 
+    def to_representation(self, instance):
+        if hasattr(instance, "is_subscribed"):
+            instance.author.is_subscribed = instance.is_subscribed
+        return super().to_representation(instance)
+
 
 class RecipeSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientWriteField(many=True, write_only=True)
@@ -186,24 +202,107 @@ class RecipeSerializer(serializers.ModelSerializer):
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients")
         tags_data = validated_data.pop("tags")
         recipe = Recipe.objects.create(**validated_data)
         self.create_recipe_ingredients(recipe, ingredients)
         recipe.tags.set(tags_data)
+        recipe_ingredients_changed.send(
+            sender=Recipe,
+            instance=recipe,
+            old_amounts={},
+            new_amounts={
+                ingredient["id"]: ingredient["amount"]
+                for ingredient in ingredients
+            },
+        )
+        recipe_tags_changed.send(
+            sender=Recipe,
+            instance=recipe,
+            added={tag.id for tag in tags_data},
+            removed=set(),
+        )
         return recipe
 
+    def update_tags(self, instance, tags_data):
+        old_tags = set(instance.tags.values_list("id", flat=True))
+        new_tags = {tag.id for tag in tags_data}
+        added = new_tags - old_tags
+        removed = old_tags - new_tags
+        if removed:
+            instance.tags.remove(*removed)
+        if added:
+            instance.tags.add(*added)
+        if added or removed:
+            recipe_tags_changed.send(
+                sender=Recipe,
+                instance=instance,
+                added=added,
+                removed=removed,
+            )
+
+    def update_recipe_ingredients(self, instance, ingredients_data):
+        old_rows = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=instance)
+        }
+        new_amounts = {
+            ingredient_data["id"]: ingredient_data["amount"]
+            for ingredient_data in ingredients_data
+        }
+        old_amounts = {
+            ingredient_id: row.amount
+            for ingredient_id, row in old_rows.items()
+        }
+        if old_amounts == new_amounts:
+            return
+        RecipeIngredient.objects.filter(
+            recipe=instance,
+            ingredient_id__in=old_amounts.keys() - new_amounts.keys(),
+        ).delete()
+        changed_rows = []
+        for ingredient_id, amount in new_amounts.items():
+            row = old_rows.get(ingredient_id)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed_rows.append(row)
+        RecipeIngredient.objects.bulk_update(changed_rows, ["amount"])
+        self.create_recipe_ingredients(
+            instance,
+            [
+                ingredient_data
+                for ingredient_data in ingredients_data
+                if ingredient_data["id"] not in old_rows
+            ],
+        )
+        recipe_ingredients_changed.send(
+            sender=Recipe,
+            instance=instance,
+            old_amounts=old_amounts,
+            new_amounts=new_amounts,
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.get("tags")
+        tags_data = validated_data.pop("tags")
         ingredients_data = validated_data.pop("ingredients")
         instance = super().update(instance, validated_data)
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_recipe_ingredients(instance, ingredients_data)
+        self.update_tags(instance, tags_data)
+        self.update_recipe_ingredients(instance, ingredients_data)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            Prefetch(
+                "recipe",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
         return RecipeReadSerializer(instance).data
 
 
@@ -218,6 +317,56 @@ class RecipeSerializerCheck(serializers.ModelSerializer):
         )
 
 
+class SimilarRecipeSerializer(RecipeSerializerCheck):
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializerCheck.Meta):
+        fields = RecipeSerializerCheck.Meta.fields + ("similarity",)
+
+
+class RecipeDetailSerializer(RecipeReadSerializer):
+    also_favorited = serializers.SerializerMethodField()
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ("also_favorited",)
+
+    def get_also_favorited(self, obj):
+        if hasattr(obj, "neighbour_list"):
+            neighbours = obj.neighbour_list
+        else:
+            neighbours = obj.neighbours.select_related("neighbour")[
+                :settings.RECOMMENDATIONS_TOP_K
+            ]
+        return RecipeSerializerCheck(
+            [neighbour.neighbour for neighbour in neighbours],
+            many=True,
+            context=self.context,
+        ).data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_LIMIT,
+    )
+
+
+class IngredientIdsSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+    )
+
+
+class RecipeMatchSerializer(RecipeReadSerializer):
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + ("matched", "missing")
+
+
 class FollowingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Following
@@ -242,7 +391,7 @@ class FollowingSerializer(serializers.ModelSerializer):
 
 class SubscriptionsSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -258,16 +407,16 @@ class SubscriptionsSerializer(CustomUserSerializer):
         )
 
     def get_recipes(self, obj):
-        recipes_limit = self.context["request"].GET.get("recipes_limit")
-        recipe_author = obj.recipe.all()
-        if recipes_limit is not None:
-            recipe_author = obj.recipe.all()[: int(recipes_limit)]
+        if hasattr(obj, "limited_recipes"):
+            recipe_author = obj.limited_recipes
+        else:
+            recipes_limit = self.context["request"].GET.get("recipes_limit")
+            recipe_author = obj.recipe.order_by("-id")
+            if recipes_limit is not None:
+                recipe_author = recipe_author[: int(recipes_limit)]
         info_recipe = RecipeSerializerCheck(recipe_author, many=True)
         return info_recipe.data
 
-    def get_recipes_count(self, obj):
-        return obj.recipe.count()
-
 
 class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -305,3 +454,14 @@ class ShoppingListSerializer(serializers.ModelSerializer):
                 user=self.context["request"].user,
                 recipe=validated_data["recipe"],
             )
+
+
+class ShoppingListExportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShoppingListExport
+        fields = (
+            "id",
+            "format",
+            "status",
+            "created",
+        )
@@ -0,0 +1,290 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCartIngredient,
+    ShoppingList,
+    Tag,
+)
+
+User = get_user_model()
+
+RECIPES_URL = "/api/recipes/"
+
+
+def create_user(number):
+    return User.objects.create_user(
+        email=f"user{number}@example.com",
+        username=f"user{number}",
+        first_name="Имя",
+        last_name="Фамилия",
+        password="password",
+    )
+
+
+class RecipeListQueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        authors = [create_user(number) for number in range(1, 4)]
+        tags = [
+            Tag.objects.create(
+                name=f"Тег {number}",
+                color=f"#00000{number}",
+                slug=f"tag{number}",
+            )
+            for number in range(3)
+        ]
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(6)
+        )
+        for number in range(12):
+            recipe = Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f"Рецепт {number}",
+                image="recipes/image.png",
+                text="Описание",
+                cooking_time=10,
+            )
+            recipe.tags.set(tags[:number % len(tags) + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in ingredients[:number % 4 + 2]
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                ShoppingList.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_query_count(self, client, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(RECIPES_URL, {"limit": limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), limit)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for client in (self.client, APIClient()):
+            with self.subTest(authenticated=client is self.client):
+                client.get(RECIPES_URL, {"limit": 1})
+                self.assertEqual(
+                    self.get_query_count(client, 2),
+                    self.get_query_count(client, 10),
+                )
+
+    def test_filtered_query_count_does_not_depend_on_page_size(self):
+        counts = []
+        params = {"tags": "tag0", "is_favorited": 1}
+        self.client.get(RECIPES_URL, {"limit": 1, **params})
+        for limit in (1, 3):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    RECIPES_URL, {"limit": limit, **params}
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data["results"]), limit)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class RecipeToggleConcurrencyTest(TransactionTestCase):
+    workers = 8
+    attempts = 16
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(0)
+        author = create_user(1)
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(3)
+        )
+        self.recipes = []
+        for number in range(4):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {number}",
+                image="recipes/image.png",
+                text="Описание",
+                cooking_time=10,
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in self.ingredients
+            )
+            self.recipes.append(recipe)
+        self.recipe = self.recipes[0]
+        self.missing_id = self.recipes[-1].id + 100
+
+    def request(self, user, method, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            return getattr(client, method)(url, data, format="json")
+        finally:
+            connection.close()
+
+    def run_concurrently(self, calls):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.request, *call) for call in calls]
+            return [future.result() for future in futures]
+
+    def get_statuses(self, user, method, url):
+        return Counter(
+            response.status_code
+            for response in self.run_concurrently(
+                [(user, method, url)] * self.attempts
+            )
+        )
+
+    def assert_cart_matches(self, user):
+        expected = Counter()
+        for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe__shopping_list__user=user
+        ).values_list("ingredient_id", "amount"):
+            expected[ingredient_id] += amount
+        self.assertEqual(
+            dict(
+                ShoppingCartIngredient.objects.filter(user=user).values_list(
+                    "ingredient_id", "total_amount"
+                )
+            ),
+            dict(expected),
+        )
+
+    def test_concurrent_add_creates_single_entry(self):
+        for model, endpoint, counter in (
+            (Favorite, "favorite", "favorites_count"),
+            (ShoppingList, "shopping_cart", "shopping_cart_count"),
+        ):
+            with self.subTest(endpoint=endpoint):
+                url = f"{RECIPES_URL}{self.recipe.id}/{endpoint}/"
+                self.assertEqual(
+                    self.get_statuses(self.user, "post", url),
+                    {201: 1, 400: self.attempts - 1},
+                )
+                self.assertEqual(
+                    model.objects.filter(
+                        user=self.user, recipe=self.recipe
+                    ).count(),
+                    1,
+                )
+                self.recipe.refresh_from_db()
+                self.assertEqual(getattr(self.recipe, counter), 1)
+        self.assert_cart_matches(self.user)
+
+    def test_concurrent_remove_deletes_single_entry(self):
+        Favorite.objects.add(self.user, self.recipe.id)
+        ShoppingList.objects.add(self.user, self.recipe.id)
+        ShoppingCartIngredient.objects.add_recipe(self.user, self.recipe)
+        for model, endpoint, counter in (
+            (Favorite, "favorite", "favorites_count"),
+            (ShoppingList, "shopping_cart", "shopping_cart_count"),
+        ):
+            with self.subTest(endpoint=endpoint):
+                url = f"{RECIPES_URL}{self.recipe.id}/{endpoint}/"
+                self.assertEqual(
+                    self.get_statuses(self.user, "delete", url),
+                    {204: 1, 400: self.attempts - 1},
+                )
+                self.assertFalse(model.objects.filter(user=self.user).exists())
+                self.recipe.refresh_from_db()
+                self.assertEqual(getattr(self.recipe, counter), 0)
+        self.assert_cart_matches(self.user)
+
+    def test_missing_recipe_statuses(self):
+        for endpoint in ("favorite", "shopping_cart"):
+            with self.subTest(endpoint=endpoint):
+                url = f"{RECIPES_URL}{self.missing_id}/{endpoint}/"
+                self.assertEqual(
+                    self.get_statuses(self.user, "post", url),
+                    {400: self.attempts},
+                )
+                self.assertEqual(
+                    self.get_statuses(self.user, "delete", url),
+                    {404: self.attempts},
+                )
+
+    def test_concurrent_users_update_counters(self):
+        users = [create_user(number) for number in range(2, 2 + self.workers)]
+        for endpoint, counter in (
+            ("favorite", "favorites_count"),
+            ("shopping_cart", "shopping_cart_count"),
+        ):
+            with self.subTest(endpoint=endpoint):
+                url = f"{RECIPES_URL}{self.recipe.id}/{endpoint}/"
+                responses = self.run_concurrently(
+                    [(user, "post", url) for user in users]
+                    + [(user, "delete", url) for user in users[::2]]
+                )
+                self.assertTrue(
+                    all(response.status_code < 500 for response in responses)
+                )
+                self.recipe.refresh_from_db()
+                self.assertEqual(
+                    getattr(self.recipe, counter),
+                    (Favorite if endpoint == "favorite" else ShoppingList)
+                    .objects.filter(recipe=self.recipe)
+                    .count(),
+                )
+        for user in users:
+            self.assert_cart_matches(user)
+
+    def test_concurrent_batch_requests(self):
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        for model, endpoint in (
+            (Favorite, "favorite"),
+            (ShoppingList, "shopping_cart"),
+        ):
+            with self.subTest(endpoint=endpoint):
+                url = f"{RECIPES_URL}{endpoint}/"
+                data = {"recipes": [*recipe_ids, self.missing_id]}
+                for method, statuses in (
+                    ("post", ("created", "exists")),
+                    ("delete", ("deleted", "missing")),
+                ):
+                    responses = self.run_concurrently(
+                        [(self.user, method, url, data)] * self.attempts
+                    )
+                    results = Counter()
+                    for response in responses:
+                        self.assertEqual(response.status_code, 200)
+                        for result in response.data["results"]:
+                            results[result["id"], result["status"]] += 1
+                    for recipe_id in recipe_ids:
+                        self.assertEqual(
+                            results[recipe_id, statuses[0]], 1
+                        )
+                        self.assertEqual(
+                            results[recipe_id, statuses[1]],
+                            self.attempts - 1,
+                        )
+                    self.assertEqual(
+                        results[self.missing_id, "not_found"], self.attempts
+                    )
+                    self.assertEqual(
+                        model.objects.filter(user=self.user).count(),
+                        len(recipe_ids) if method == "post" else 0,
+                    )
+                    self.assert_cart_matches(self.user)
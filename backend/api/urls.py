@@ -25,7 +25,18 @@ urlpatterns = [
         ShoppingListViewSet.as_view(
             {
                 "get": "download_shopping_cart",
+                "post": "create_export",
             },
+            **ShoppingListViewSet.download_shopping_cart.kwargs,
+        ),
+    ),
+    path(
+        "recipes/download_shopping_cart/<int:pk>/",
+        ShoppingListViewSet.as_view(
+            {
+                "get": "export",
+            },
+            **ShoppingListViewSet.export.kwargs,
         ),
     ),
     path("", include(router.urls)),
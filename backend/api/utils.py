@@ -1,41 +1,91 @@
+import csv
+from tempfile import TemporaryFile
+
 from django.conf import settings
-from django.http import HttpResponse
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from openpyxl import Workbook
 
+from .pdf import get_cached_pdf
 
-VALUE = 'attachment; filename="ingredient_list.pdf"'
 
+VALUE = 'attachment; filename="ingredient_list.{}"'
+HEADERS = ("Ингредиент", "Количество", "Единицы измерения")
 
-def get_pdf(ingredient_list):
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = VALUE
 
-    pdfmetrics.registerFont(
-        TTFont(
-            "Times",
-            f"{settings.BASE_DIR}/fonts/timesnewromanpsmt.ttf", "UTF-8"
+class Echo:
+    def write(self, value):
+        return value
+
+
+def get_rows(ingredient_list):
+    for ingredient in ingredient_list.iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    ):
+        yield (
+            ingredient["ingredient__name"],
+            ingredient["total_amount"],
+            ingredient["ingredient__measurement_unit"],
         )
-    )
 
-    p = canvas.Canvas(response)
-    p.setFont("Times", settings.FONT)
-    p.drawString(
-        settings.STRING_TITLE_X, settings.STRING_TITLE_Y, "Список ингредиентов"
+
+def get_pdf(ingredient_list):
+    response = HttpResponse(
+        get_cached_pdf(ingredient_list),
+        content_type="application/pdf",
     )
+    response["Content-Disposition"] = VALUE.format("pdf")
+    return response
 
-    y = settings.STRING_CONTENT_Y
-    for ingredient in ingredient_list:
-        text = (
-            f"{ingredient['total_amount']} "
-            f"{ingredient['recipe__ingredients__measurement_unit']}. "
-            f"{ingredient['recipe__ingredients__name']}"
-        )
-        p.drawString(settings.STRING_CONTENT_X, y, text)
-        y -= settings.LINE_OFFSET_CONTENT
 
-    p.showPage()
-    p.save()
+def get_csv(ingredient_list):
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (
+            writer.writerow(row)
+            for rows in ([HEADERS], get_rows(ingredient_list))
+            for row in rows
+        ),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = VALUE.format("csv")
+    return response
+
 
+def get_txt(ingredient_list):
+    response = StreamingHttpResponse(
+        (
+            f"{amount} {measurement_unit}. {name}\n"
+            for name, amount, measurement_unit in get_rows(ingredient_list)
+        ),
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Content-Disposition"] = VALUE.format("txt")
     return response
+
+
+def get_xlsx(ingredient_list):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Список ингредиентов")
+    sheet.append(HEADERS)
+    for row in get_rows(ingredient_list):
+        sheet.append(row)
+    file = TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename="ingredient_list.xlsx",
+        content_type=(
+            "application/vnd.openxmlformats-officedocument."
+            "spreadsheetml.sheet"
+        ),
+    )
+
+
+EXPORTS = {
+    "pdf": get_pdf,
+    "csv": get_csv,
+    "txt": get_txt,
+    "xlsx": get_xlsx,
+}
@@ -11,12 +11,20 @@ def ingredients_validator(attrs):
     ingredients = attrs.get("ingredients", [])
     if not ingredients:
         raise ValidationError("Должен присутствовать хотя бы один ингредиент.")
-    unique_ingredients_ids = list()
-    for ingredient in ingredients:
-        ingredient = Ingredient.objects.get(id=ingredient["id"])
-        if ingredient in unique_ingredients_ids:
-            raise ValidationError("Ингредиенты должны быть уникальными.")
-        unique_ingredients_ids.append(ingredient)
+    ingredients_ids = [ingredient["id"] for ingredient in ingredients]
+    unique_ingredients_ids = set(ingredients_ids)
+    if len(unique_ingredients_ids) != len(ingredients_ids):
+        raise ValidationError("Ингредиенты должны быть уникальными.")
+    missing_ids = unique_ingredients_ids - set(
+        Ingredient.objects.filter(
+            id__in=unique_ingredients_ids
+        ).values_list("id", flat=True)
+    )
+    if missing_ids:
+        raise ValidationError(
+            "Ингредиенты не найдены: "
+            f"{', '.join(map(str, sorted(missing_ids)))}."
+        )
 
 
 def tags_validator(attrs):
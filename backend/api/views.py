@@ -1,7 +1,17 @@
-from django.db.models import Exists, OuterRef, Count
+from functools import partial
+
+from django.db.models import (
+    BooleanField,
+    Exists,
+    OuterRef,
+    Count,
+    Prefetch,
+    Value,
+    Window,
+)
+from django.db.models.functions import RowNumber
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from django.db.models.aggregates import Sum
 from djoser.views import UserViewSet
 from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
@@ -10,16 +20,27 @@ from rest_framework.permissions import (
 )
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.settings import api_settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
 
 from users.models import Following
+from recipes.search import ingredient_index, recipe_ingredient_index
 from recipes.models import (
     Recipe,
+    RecipeBucket,
+    RecipeIngredient,
     Ingredient,
     Tag,
     Favorite,
     ShoppingList,
+    ShoppingCartIngredient,
+    RecipeNeighbour,
+    ShoppingListExport,
+    TimelineEntry,
 )
 from .serializers import (
     CustomUserSerializer,
@@ -28,15 +49,33 @@ from .serializers import (
     IngredientSerializer,
     RecipeReadSerializer,
     FollowingSerializer,
-    FavoriteSerializer,
     ShoppingListSerializer,
     RecipeSerializerCheck,
     SubscriptionsSerializer,
+    ShoppingListExportSerializer,
+    RecipeIdsSerializer,
+    RecipeDetailSerializer,
+    SimilarRecipeSerializer,
+    IngredientIdsSerializer,
+    RecipeMatchSerializer,
 )
+from .cache import get_cached_response
 from .filters import IngredientFilter, RecipeFilter
-from .utils import get_pdf
+from .utils import EXPORTS
+from .exports import fail_stale, get_expired, get_or_create_export
+from .renderers import (
+    PDFRenderer,
+    CSVRenderer,
+    TXTRenderer,
+    XLSXRenderer,
+)
 from .permissions import IsAuthorOrReadOnly
-from .paginators import CustomPaginator
+from .paginators import (
+    CustomPaginator,
+    RecipeCursorPaginator,
+    RecipePaginator,
+    TrendingPaginator,
+)
 
 User = get_user_model()
 
@@ -85,14 +124,30 @@ class CustomUserViewSet(UserViewSet):
     @action(
         ["GET"],
         detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=CustomPaginator,
     )
     def subscriptions(self, request):
-        subscriptions = User.objects.filter(following__user=request.user.id)
-        limit = self.request.GET.get("limit")
-        if limit is not None:
-            subscriptions = User.objects.filter(
-                following__user=request.user.id
-            )[:int(limit)]
+        recipes = Recipe.objects.order_by("-id")
+        recipes_limit = self.request.GET.get("recipes_limit")
+        if recipes_limit is not None:
+            recipes = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by="author",
+                    order_by="-id",
+                )
+            ).filter(row_number__lte=int(recipes_limit))
+        subscriptions = (
+            User.objects.filter(following__user=request.user.id)
+            .annotate(
+                is_subscribed=Value(True, output_field=BooleanField()),
+            )
+            .prefetch_related(
+                Prefetch("recipe", queryset=recipes, to_attr="limited_recipes")
+            )
+            .order_by("id")
+        )
         page = self.paginate_queryset(subscriptions)
         if page is not None:
             serializer = SubscriptionsSerializer(
@@ -110,49 +165,103 @@ class CustomUserViewSet(UserViewSet):
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
     http_method_names = ["get", "post", "delete", "patch"]
     permission_classes = [
         IsAuthenticatedOrReadOnly,
         IsAuthorOrReadOnly,
     ]
-    pagination_class = CustomPaginator
+    pagination_class = RecipePaginator
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        queryset = Recipe.objects.get_correct_user(self.request.user)
+        if self.action == "feed":
+            queryset = queryset.filter(
+                TimelineEntry.objects.get_feed_filter(self.request.user)
+            )
+        if self.action in [
+            "list",
+            "retrieve",
+            "by_ingredients",
+            "feed",
+            "trending",
+        ]:
+            queryset = queryset.select_related("author").prefetch_related(
+                Prefetch("tags"),
+                Prefetch(
+                    "recipe",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient"
+                    ),
+                ),
+            )
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "neighbours",
+                    queryset=RecipeNeighbour.objects.select_related(
+                        "neighbour"
+                    ),
+                    to_attr="neighbour_list",
+                )
+            )
+        return queryset
+
     def get_serializer_class(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action == "retrieve":
+            return RecipeDetailSerializer
+        if self.action in ["list", "feed", "trending"]:
             return RecipeReadSerializer
+        if self.action == "by_ingredients":
+            return RecipeMatchSerializer
         return RecipeSerializer
 
+    def list(self, request, *args, **kwargs):
+        get_response = partial(super().list, request, *args, **kwargs)
+        if not request.user.is_anonymous:
+            return get_response()
+        return get_cached_response(
+            request, ["recipe_list", "ingredients"], get_response
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        get_response = partial(super().retrieve, request, *args, **kwargs)
+        if not request.user.is_anonymous or not self.kwargs["pk"].isdigit():
+            return get_response()
+        return get_cached_response(
+            request,
+            [
+                f"recipe:{int(self.kwargs['pk'])}",
+                "ingredients",
+                "recommendations",
+            ],
+            get_response,
+        )
+
     def perform_create(self, serializer):
         serializer.save(
             author=self.request.user,
         )
 
-    def add_obj(self, serializer_class, request, pk):
-        try:
-            recipe = Recipe.objects.get(pk=pk)
-        except Recipe.DoesNotExist:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        serializer = serializer_class(
-            data={"user": request.user.id, "recipe": recipe.id}
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        recipe_serializer = RecipeSerializerCheck(recipe)
+    def add_obj(self, model, message, request, pk):
+        if not model.objects.add(request.user, pk):
+            if not Recipe.objects.filter(pk=pk).exists():
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                data={api_settings.NON_FIELD_ERRORS_KEY: [message]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        recipe_serializer = RecipeSerializerCheck(Recipe.objects.get(pk=pk))
         return Response(
             data=recipe_serializer.data,
             status=status.HTTP_201_CREATED,
         )
 
     def remove_obj(self, model, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        try:
-            item = model.objects.get(user=request.user, **{"recipe": recipe})
-        except model.DoesNotExist:
+        if not model.objects.remove(request.user, pk):
+            get_object_or_404(Recipe, pk=pk)
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        item.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -161,17 +270,158 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk):
         if request.method == "POST":
-            return self.add_obj(FavoriteSerializer, request, pk)
+            return self.add_obj(
+                Favorite, "Рецепт уже добавлен в избранное", request, pk
+            )
         return self.remove_obj(Favorite, request, pk)
 
     @action(
         ["POST", "DELETE"],
         detail=True,
     )
+    @transaction.atomic
     def shopping_cart(self, request, pk):
         if request.method == "POST":
-            return self.add_obj(ShoppingListSerializer, request, pk)
-        return self.remove_obj(ShoppingList, request, pk)
+            response = self.add_obj(
+                ShoppingList, "Рецепт уже добавлен в корзину", request, pk
+            )
+            if response.status_code == status.HTTP_201_CREATED:
+                ShoppingCartIngredient.objects.add_recipe(
+                    request.user, Recipe(pk=pk)
+                )
+            return response
+        response = self.remove_obj(ShoppingList, request, pk)
+        if response.status_code == status.HTTP_204_NO_CONTENT:
+            ShoppingCartIngredient.objects.remove_recipe(
+                request.user, Recipe(pk=pk)
+            )
+        return response
+
+    @action(
+        ["GET"],
+        detail=False,
+        pagination_class=CustomPaginator,
+    )
+    def by_ingredients(self, request):
+        serializer = IngredientIdsSerializer(
+            data={"ingredients": request.query_params.getlist("ingredients")}
+        )
+        serializer.is_valid(raise_exception=True)
+        matches = recipe_ingredient_index.search(
+            serializer.validated_data["ingredients"]
+        )
+        page = self.paginate_queryset(matches)
+        if page is not None:
+            matches = page
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        results = []
+        for recipe_id, matched, missing in matches:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.matched = matched
+            recipe.missing = missing
+            results.append(recipe)
+        serializer = self.get_serializer(results, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @action(
+        ["GET"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=RecipeCursorPaginator,
+    )
+    def feed(self, request):
+        return self.list(request)
+
+    @action(
+        ["GET"],
+        detail=True,
+    )
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe.objects.only("id", "minhash"), pk=pk)
+        serializer = SimilarRecipeSerializer(
+            RecipeBucket.objects.get_similar(
+                recipe, settings.SIMILAR_RECIPES_LIMIT
+            ),
+            many=True,
+            context={"request": request},
+        )
+        return Response(serializer.data)
+
+    @action(
+        ["GET"],
+        detail=False,
+        pagination_class=TrendingPaginator,
+    )
+    def trending(self, request):
+        queryset = (
+            self.get_queryset()
+            .filter(trending_score__gt=0)
+            .order_by("-trending_score", "-id")
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def change_objs(self, model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data["recipes"]))
+        if request.method == "POST":
+            changed = model.objects.add_many(request.user, recipe_ids)
+            statuses = ("created", "exists")
+        else:
+            changed = model.objects.remove_many(request.user, recipe_ids)
+            statuses = ("deleted", "missing")
+        existing = changed | set(
+            Recipe.objects.filter(
+                id__in=set(recipe_ids) - changed
+            ).values_list("id", flat=True)
+        )
+        results = [
+            {
+                "id": recipe_id,
+                "status": (
+                    statuses[0] if recipe_id in changed
+                    else statuses[1] if recipe_id in existing
+                    else "not_found"
+                ),
+            }
+            for recipe_id in recipe_ids
+        ]
+        return changed, Response(data={"results": results})
+
+    @action(
+        ["POST", "DELETE"],
+        detail=False,
+        url_path="favorite",
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_batch(self, request):
+        _, response = self.change_objs(Favorite, request)
+        return response
+
+    @action(
+        ["POST", "DELETE"],
+        detail=False,
+        url_path="shopping_cart",
+        permission_classes=[IsAuthenticated],
+    )
+    @transaction.atomic
+    def shopping_cart_batch(self, request):
+        changed, response = self.change_objs(ShoppingList, request)
+        if request.method == "POST":
+            ShoppingCartIngredient.objects.add_recipes(request.user, changed)
+        else:
+            ShoppingCartIngredient.objects.remove_recipes(
+                request.user, changed
+            )
+        return response
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -191,6 +441,15 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     ]
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if name:
+            serializer = self.get_serializer(
+                ingredient_index.startswith(name), many=True
+            )
+            return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
+
 
 class FollowingViewSet(viewsets.ModelViewSet):
     serializer_class = FollowingSerializer
@@ -238,15 +497,54 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
     @action(
         ["GET"],
         detail=False,
+        renderer_classes=[
+            PDFRenderer,
+            CSVRenderer,
+            TXTRenderer,
+            XLSXRenderer,
+        ],
     )
     def download_shopping_cart(self, request):
         ingredient_list = (
-            ShoppingList.objects.filter(user=request.user)
-            .values(
-                "recipe__ingredients__name",
-                "recipe__ingredients__measurement_unit",
+            ShoppingCartIngredient.objects.get_ingredient_list(request.user)
+        )
+        return EXPORTS[request.accepted_renderer.format](ingredient_list)
+
+    def create_export(self, request):
+        job, created = get_or_create_export(
+            request.user, request.accepted_renderer.format
+        )
+        return Response(
+            data=ShoppingListExportSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        )
+
+    @action(
+        ["GET"],
+        detail=True,
+    )
+    def export(self, request, pk):
+        fail_stale()
+        job = get_object_or_404(
+            ShoppingListExport.objects.exclude(
+                id__in=get_expired().values("id")
+            ),
+            id=pk,
+            user=request.user,
+        )
+        if job.status != ShoppingListExport.Status.DONE:
+            return Response(data=ShoppingListExportSerializer(job).data)
+        filename = f"ingredient_list.{job.format}"
+        if settings.DEBUG:
+            return FileResponse(
+                job.file.open("rb"), as_attachment=True, filename=filename
             )
-            .annotate(total_amount=Sum("recipe__recipe__amount"))
-            .order_by("recipe__ingredients__name")
+        response = HttpResponse()
+        response["Content-Type"] = ""
+        response["Content-Disposition"] = (
+            f'attachment; filename="{filename}"'
+        )
+        response["X-Accel-Redirect"] = (
+            f"{settings.EXPORT_ACCEL_REDIRECT_URL}{job.file.name}"
         )
-        return get_pdf(ingredient_list)
+        return response
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -99,6 +100,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "TEST": {
+            "NAME": BASE_DIR / "test_db.sqlite3",
+        },
     }
 }
 # DATABASES = {
@@ -143,6 +147,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+PRIVATE_MEDIA_ROOT = os.getenv(
+    "PRIVATE_MEDIA_ROOT", str(BASE_DIR / "private_media")
+)
 
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "collected_static"
@@ -154,4 +161,28 @@ STRING_TITLE_X = 150
 STRING_TITLE_Y = 800
 STRING_CONTENT_X = 50
 STRING_CONTENT_Y = 750
+STRING_CONTENT_MIN_Y = 50
 LINE_OFFSET_CONTENT = 25
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+EXPORT_TTL = 60 * 60
+EXPORT_JOB_TIMEOUT = 10 * 60
+EXPORT_ACCEL_REDIRECT_URL = "/protected_media/"
+INGREDIENT_SEARCH_LIMIT = 20
+BULK_RECIPES_LIMIT = 100
+COUNT_CACHE_TIMEOUT = 60
+COUNT_ESTIMATE_THRESHOLD = 100000
+INGREDIENT_SIMILARITY_THRESHOLD = 0.3
+FEED_TIMELINE_SIZE = 300
+FEED_FANOUT_LIMIT = 1000
+FEED_FANOUT_BATCH_SIZE = 500
+TRENDING_HALF_LIFE = 2 * 24 * 60 * 60
+TRENDING_WINDOW = timedelta(days=14)
+RECOMMENDATIONS_TOP_K = 10
+SIMILAR_RECIPES_LIMIT = 10
+RESPONSE_CACHE_TIMEOUT = 5 * 60
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+RESPONSE_CACHE_WAIT = 0.05
+VERSION_CACHE_TIMEOUT = 5
+SHOPPING_CART_UPSERT_BATCH_SIZE = 300
@@ -0,0 +1,72 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "recipes_recipe_fts"
+SEARCH_CONFIG = "russian"
+
+
+def get_fts_query(query):
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
+
+
+def update_search_index(recipe, using="default"):
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, text) VALUES (%s, %s, %s)",
+            [recipe.pk, recipe.name, recipe.text],
+        )
+
+
+def delete_search_index(recipe_id, using="default"):
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe_id])
+
+
+def search_recipes(queryset, query):
+    table = queryset.model._meta.db_table
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.filter(
+            RawSQL(
+                f"{table}.search_vector @@ {tsquery}",
+                (query,),
+                output_field=BooleanField(),
+            )
+        ).order_by(
+            RawSQL(
+                f"ts_rank({table}.search_vector, {tsquery})",
+                (query,),
+                output_field=FloatField(),
+            ).desc(),
+            "-id",
+        )
+    if vendor == "sqlite":
+        fts_query = get_fts_query(query)
+        if not fts_query:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                (fts_query,),
+            )
+        ).order_by(
+            RawSQL(
+                f"(SELECT bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)",
+                (fts_query,),
+                output_field=FloatField(),
+            ).asc(),
+            "-id",
+        )
+    return queryset.filter(name__icontains=query)
@@ -0,0 +1,66 @@
+import random
+import time
+from statistics import quantiles
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient
+from recipes.search import ingredient_index
+
+
+class Command(BaseCommand):
+    help = 'Измеряет задержку автодополнения и поиска ингредиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=1000,
+            help='Количество запросов для каждого вида поиска',
+        )
+        parser.add_argument(
+            '--prefix-length',
+            type=int,
+            default=2,
+            help='Длина префикса запроса',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора запросов',
+        )
+
+    def measure(self, search, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        percentiles = quantiles(timings, n=100)
+        return percentiles[49], percentiles[94], percentiles[98]
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('Нет ингредиентов для измерения')
+        generator = random.Random(options['seed'])
+        queries = [
+            generator.choice(names)[:options['prefix_length']].casefold()
+            for _ in range(options['queries'])
+        ]
+        started = time.perf_counter()
+        ingredient_index.get_state()
+        self.stdout.write(
+            f'Индекс: {len(names)} ингредиентов, построен за '
+            f'{time.perf_counter() - started:.2f} с'
+        )
+        for label, search in (
+            ('startswith', ingredient_index.startswith),
+            ('search', ingredient_index.search),
+        ):
+            p50, p95, p99 = self.measure(search, queries)
+            self.stdout.write(
+                f'{label}: p50 {p50:.0f} мкс, p95 {p95:.0f} мкс, '
+                f'p99 {p99:.0f} мкс'
+            )
@@ -0,0 +1,103 @@
+import random
+import time
+from statistics import quantiles
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from api.pdf import CACHE_KEY, get_cached_pdf, get_cart_version, get_lines
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время формирования PDF-списка покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=500,
+            help='Количество ингредиентов в корзине',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Количество замеров для каждого сценария',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора корзины',
+        )
+
+    def get_ingredient_list(self, count, seed):
+        generator = random.Random(seed)
+        return [
+            {
+                'ingredient__name': f'Ингредиент {number}',
+                'ingredient__measurement_unit': generator.choice(
+                    ('г', 'мл', 'шт', 'ст. л.')
+                ),
+                'total_amount': generator.randint(1, 5000),
+            }
+            for number in range(count)
+        ]
+
+    def get_expected_pages(self, count):
+        first_page = (
+            settings.STRING_CONTENT_Y - settings.STRING_CONTENT_MIN_Y
+        ) // settings.LINE_OFFSET_CONTENT + 1
+        other_pages = (
+            settings.STRING_TITLE_Y - settings.STRING_CONTENT_MIN_Y
+        ) // settings.LINE_OFFSET_CONTENT + 1
+        if count <= first_page:
+            return 1
+        return 1 + -(-(count - first_page) // other_pages)
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        percentiles = quantiles(timings, n=100)
+        return percentiles[49], percentiles[94], percentiles[98]
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError('Нужно не меньше двух замеров')
+        ingredient_list = self.get_ingredient_list(
+            options['ingredients'], options['seed']
+        )
+        key = CACHE_KEY.format(get_cart_version(get_lines(ingredient_list)))
+        cache.delete(key)
+        content = get_cached_pdf(ingredient_list)
+        pages = content.count(b'/Type /Page') - content.count(b'/Type /Pages')
+        expected = self.get_expected_pages(options['ingredients'])
+        if pages != expected:
+            raise CommandError(
+                f'Ожидалось страниц: {expected}, получено: {pages}'
+            )
+        if get_cached_pdf(ingredient_list) != content:
+            raise CommandError('Кэшированный PDF отличается от исходного')
+        self.stdout.write(
+            f'Корзина: {options["ingredients"]} ингредиентов, '
+            f'страниц: {pages}, размер: {len(content) / 1024:.0f} КБ'
+        )
+
+        def render_miss():
+            cache.delete(key)
+            get_cached_pdf(ingredient_list)
+
+        for label, render in (
+            ('miss', render_miss),
+            ('hit', lambda: get_cached_pdf(ingredient_list)),
+        ):
+            p50, p95, p99 = self.measure(render, options['repeat'])
+            self.stdout.write(
+                f'{label}: p50 {p50:.2f} мс, p95 {p95:.2f} мс, '
+                f'p99 {p99:.2f} мс'
+            )
+        cache.delete(key)
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import RecipeNeighbour
+from recipes.recommendations import InteractionMatrix
+from recipes.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации по избранному и корзинам покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=settings.RECOMMENDATIONS_TOP_K,
+            help='Количество соседей у каждого рецепта',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество рецептов в одной пачке',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        matrix = InteractionMatrix()
+        matrix.build()
+        recipe_count = len(matrix.recipe_ids)
+        chunk_size = options['chunk_size']
+        total = 0
+        with transaction.atomic():
+            RecipeNeighbour.objects.all().delete()
+            for start in range(0, recipe_count, chunk_size):
+                recipe_ids, neighbour_ids, scores = matrix.get_neighbours(
+                    start,
+                    min(start + chunk_size, recipe_count),
+                    options['top_k'],
+                )
+                neighbours = [
+                    RecipeNeighbour(
+                        recipe_id=recipe_id,
+                        neighbour_id=neighbour_id,
+                        score=score,
+                    )
+                    for recipe_id, neighbour_id, score in zip(
+                        recipe_ids.tolist(),
+                        neighbour_ids.tolist(),
+                        scores.tolist(),
+                    )
+                ]
+                RecipeNeighbour.objects.bulk_create(neighbours)
+                total += len(neighbours)
+        bump_version('recommendations')
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Взаимодействий: {matrix.interactions}, '
+                f'рецептов: {recipe_count}, соседей: {total} '
+                f'за {elapsed:.1f} с'
+            )
+        )
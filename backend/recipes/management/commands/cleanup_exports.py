@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.exports import (
+    delete_expired,
+    delete_orphaned,
+    fail_stale,
+    get_expired,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет устаревшие выгрузки списка покупок и помечает '
+        'зависшие задачи как ошибочные'
+    )
+
+    def handle(self, *args, **options):
+        failed = fail_stale()
+        expired = get_expired().count()
+        delete_expired()
+        orphaned = delete_orphaned()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Зависших задач: {failed}, удалено устаревших: {expired}, '
+                f'удалено файлов без задачи: {orphaned}'
+            )
+        )
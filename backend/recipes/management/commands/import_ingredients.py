@@ -1,32 +1,70 @@
 import csv
+import json
+import time
+from itertools import islice
 
-from django.db.utils import IntegrityError
 from django.core.management.base import BaseCommand
 
 from foodgram.settings import BASE_DIR
 from recipes.models import Ingredient
+from recipes.search import bump_ingredient_version
 
 DATA_DIR = f'{BASE_DIR}/data'
 
 
 class Command(BaseCommand):
-    help = 'Импортирует данные из csv-файлов в базу данных'
+    help = 'Импортирует данные из csv- или json-файлов в базу данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=f'{DATA_DIR}/ingredients.csv',
+            help='Путь к csv-файлу или json-фикстуре',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной пачке',
+        )
+
+    def read_csv(self, file):
+        for row in csv.reader(file):
+            if row:
+                yield row[0], row[1]
+
+    def read_json(self, file):
+        for item in json.load(file):
+            fields = item.get('fields', item)
+            yield fields['name'], fields['measurement_unit']
 
     def handle(self, *args, **options):
-        with open(
-            f'{DATA_DIR}/ingredients.csv',
-            encoding='utf-8'
-        ) as csv_file:
-            reader = csv.reader(csv_file)
-            next(reader)
-            for row in reader:
-                try:
-                    Ingredient.objects.create(
-                        name=row[0],
-                        measurement_unit=row[1]
+        path = options['path']
+        read = self.read_json if path.endswith('.json') else self.read_csv
+        total = 0
+        started = time.monotonic()
+        existing = Ingredient.objects.count()
+        with open(path, encoding='utf-8') as file:
+            rows = read(file)
+            while True:
+                batch = [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in islice(
+                        rows, options['batch_size']
                     )
-                except IntegrityError:
-                    continue
-            self.stdout.write(
-                self.style.SUCCESS('Данные успешно импортированы')
+                ]
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+        inserted = Ingredient.objects.count() - existing
+        if inserted:
+            bump_ingredient_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Данные успешно импортированы: добавлено {inserted}, '
+                f'пропущено {total - inserted} из {total} строк '
+                f'за {elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} строк/с)'
             )
+        )
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.core.management.base import BaseCommand
+
+from recipes.models import RecipeIngredient, ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает или проверяет агрегированные корзины покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить таблицу, не изменяя её',
+        )
+
+    def get_expected(self):
+        rows = (
+            RecipeIngredient.objects.filter(
+                recipe__shopping_list__isnull=False
+            )
+            .values('recipe__shopping_list__user', 'ingredient')
+            .annotate(total_amount=Sum('amount'))
+            .values_list(
+                'recipe__shopping_list__user', 'ingredient', 'total_amount'
+            )
+        )
+        return {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount in rows
+        }
+
+    def handle(self, *args, **options):
+        expected = self.get_expected()
+        if options['check']:
+            actual = {
+                (user_id, ingredient_id): total_amount
+                for user_id, ingredient_id, total_amount in (
+                    ShoppingCartIngredient.objects.values_list(
+                        'user', 'ingredient', 'total_amount'
+                    )
+                )
+            }
+            mismatched = expected.keys() | actual.keys()
+            mismatched = [
+                key for key in mismatched
+                if expected.get(key) != actual.get(key)
+            ]
+            if mismatched:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f'Найдено расхождений: {len(mismatched)}'
+                    )
+                )
+                return
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
+            return
+        with transaction.atomic():
+            ShoppingCartIngredient.objects.all().delete()
+            ShoppingCartIngredient.objects.bulk_create(
+                ShoppingCartIngredient(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total_amount,
+                )
+                for (user_id, ingredient_id), total_amount in expected.items()
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Корзины пересобраны: {len(expected)} строк')
+        )
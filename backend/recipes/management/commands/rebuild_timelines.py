@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes.models import TimelineEntry
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из подписок и рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            help='Пересобрать ленту только указанного пользователя',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество пользователей в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user'] or list(
+            User.objects.filter(
+                Q(follower__isnull=False) | Q(timeline__isnull=False)
+            )
+            .distinct()
+            .values_list('pk', flat=True)
+        )
+        batch_size = options['batch_size']
+        for start in range(0, len(user_ids), batch_size):
+            TimelineEntry.objects.rebuild(user_ids[start:start + batch_size])
+        self.stdout.write(
+            self.style.SUCCESS(f'Ленты пересобраны: {len(user_ids)}')
+        )
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingList
+from users.models import Following
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingList, 'recipe'),
+    (User, 'followers_count', Following, 'author'),
+    (User, 'recipes_count', Recipe, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает или проверяет счётчики рецептов и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, не изменяя их',
+        )
+
+    def get_expected(self, related_model, field):
+        return Coalesce(
+            Subquery(
+                related_model.objects.filter(**{field: OuterRef('pk')})
+                .order_by()
+                .values(field)
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+
+    def handle(self, *args, **options):
+        mismatched = 0
+        with transaction.atomic():
+            for model, counter, related_model, field in COUNTERS:
+                expected = self.get_expected(related_model, field)
+                stale = (
+                    model.objects.annotate(expected=expected)
+                    .exclude(**{counter: F('expected')})
+                    .values('pk')
+                )
+                count = stale.count()
+                mismatched += count
+                if count:
+                    self.stdout.write(
+                        f'{model._meta.model_name}.{counter}: {count}'
+                    )
+                if count and not options['check']:
+                    model.objects.filter(pk__in=stale).update(
+                        **{counter: expected}
+                    )
+        if options['check'] and mismatched:
+            self.stdout.write(
+                self.style.ERROR(f'Найдено расхождений: {mismatched}')
+            )
+            return
+        if mismatched:
+            self.stdout.write(
+                self.style.SUCCESS(f'Исправлено счётчиков: {mismatched}')
+            )
+            return
+        self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает популярность рецептов по недавнему избранному'
+
+    def handle(self, *args, **options):
+        count = Recipe.objects.update_trending_scores()
+        self.stdout.write(
+            self.style.SUCCESS(f'Популярность пересчитана: {count} рецептов')
+        )
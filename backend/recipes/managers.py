@@ -1,18 +1,48 @@
-from django.db.models import Manager, Exists, OuterRef
+from math import exp, log
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import (
+    BooleanField,
+    Count,
+    F,
+    Manager,
+    Exists,
+    OuterRef,
+    Q,
+    Sum,
+    Value,
+    Window,
+)
+from django.db.models.functions import Greatest, RowNumber, TruncHour
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 from users.models import Following
+from .similarity import (
+    get_buckets,
+    get_signature,
+    get_similarity,
+    load_signature,
+)
+from .versions import bump_version
 
 User = get_user_model()
 
 
 class RecipeManager(Manager):
     def get_correct_user(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_subscribed=Value(False, output_field=BooleanField()),
+            )
         return (
             self.annotate(
                 is_in_shopping_cart=Exists(
                     queryset=User.objects.filter(
-                        id=user.id, shopping_list=OuterRef("pk")
+                        id=user.id, shopping_list__recipe=OuterRef("pk")
                     )
                 )
             )
@@ -20,14 +50,373 @@ class RecipeManager(Manager):
                 is_favorited=Exists(
                     queryset=User.objects.filter(
                         id=user.id,
-                        favorites=OuterRef("pk")
+                        favorite__recipe=OuterRef("pk")
                     )
                 )
             )
             .annotate(
                 is_subscribed=Exists(
                     queryset=Following.objects.filter(
-                        user=user, author=OuterRef("pk"))
+                        user=user, author=OuterRef("author")
+                    )
+                )
+            )
+        )
+
+    def update_trending_scores(self):
+        favorite_model = self.model._meta.apps.get_model(
+            "recipes", "Favorite"
+        )
+        now = timezone.now()
+        decay = log(2) / settings.TRENDING_HALF_LIFE
+        scores = {}
+        for recipe_id, hour, count in (
+            favorite_model.objects.filter(
+                added__gte=now - settings.TRENDING_WINDOW
+            )
+            .annotate(hour=TruncHour("added"))
+            .values("recipe_id", "hour")
+            .annotate(count=Count("pk"))
+            .values_list("recipe_id", "hour", "count")
+            .iterator()
+        ):
+            age = (now - hour).total_seconds()
+            scores[recipe_id] = (
+                scores.get(recipe_id, 0) + count * exp(-decay * age)
+            )
+        recipes = [
+            self.model(pk=recipe_id, trending_score=score)
+            for recipe_id, score in scores.items()
+        ]
+        with transaction.atomic():
+            self.filter(trending_score__gt=0).exclude(pk__in=scores).update(
+                trending_score=0
+            )
+            self.bulk_update(recipes, ["trending_score"], batch_size=1000)
+        return len(recipes)
+
+
+class UserRecipeManager(Manager):
+    counter_field = None
+
+    def update_counters(self, recipe_ids, delta):
+        self.model._meta.get_field("recipe").related_model.objects.filter(
+            pk__in=recipe_ids
+        ).update(
+            **{
+                self.counter_field: Greatest(
+                    F(self.counter_field) + delta, 0
+                )
+            }
+        )
+
+    def add_many(self, user, recipe_ids):
+        if not recipe_ids:
+            return set()
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        recipe_model = self.model._meta.get_field("recipe").related_model
+        with transaction.atomic(using=self.db):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {quote(self.model._meta.db_table)} "
+                    "(user_id, recipe_id, added) "
+                    "SELECT %s, id, %s "
+                    f"FROM {quote(recipe_model._meta.db_table)} "
+                    f"WHERE id IN ({', '.join(['%s'] * len(recipe_ids))}) "
+                    "ON CONFLICT (user_id, recipe_id) DO NOTHING "
+                    "RETURNING recipe_id",
+                    [
+                        user.id,
+                        connection.ops.adapt_datetimefield_value(
+                            timezone.now()
+                        ),
+                        *recipe_ids,
+                    ],
+                )
+                added = {recipe_id for recipe_id, in cursor.fetchall()}
+            if added:
+                self.update_counters(added, 1)
+                bump_version(f"user:{user.id}")
+        return added
+
+    def remove_many(self, user, recipe_ids):
+        if not recipe_ids:
+            return set()
+        connection = connections[self.db]
+        placeholders = ", ".join(["%s"] * len(recipe_ids))
+        with transaction.atomic(using=self.db):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM "
+                    f"{connection.ops.quote_name(self.model._meta.db_table)} "
+                    f"WHERE user_id = %s AND recipe_id IN ({placeholders}) "
+                    "RETURNING recipe_id",
+                    [user.id, *recipe_ids],
+                )
+                removed = {recipe_id for recipe_id, in cursor.fetchall()}
+            if removed:
+                self.update_counters(removed, -1)
+                bump_version(f"user:{user.id}")
+        return removed
+
+    def add(self, user, recipe_id):
+        return bool(self.add_many(user, [recipe_id]))
+
+    def remove(self, user, recipe_id):
+        return bool(self.remove_many(user, [recipe_id]))
+
+
+class FavoriteManager(UserRecipeManager):
+    counter_field = "favorites_count"
+
+
+class ShoppingListManager(UserRecipeManager):
+    counter_field = "shopping_cart_count"
+
+
+class ShoppingCartIngredientManager(Manager):
+    def apply_amounts(self, user_ids, amounts):
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items()
+            if amount
+        }
+        if not user_ids or not amounts:
+            return
+        added = [
+            (user_id, ingredient_id, amount)
+            for user_id in user_ids
+            for ingredient_id, amount in amounts.items()
+            if amount > 0
+        ]
+        removed = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items()
+            if amount < 0
+        }
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        batch_size = settings.SHOPPING_CART_UPSERT_BATCH_SIZE
+        with transaction.atomic(using=self.db):
+            with connection.cursor() as cursor:
+                for start in range(0, len(added), batch_size):
+                    rows = added[start:start + batch_size]
+                    cursor.execute(
+                        f"INSERT INTO {table} "
+                        "(user_id, ingredient_id, total_amount) "
+                        f"VALUES {', '.join(['(%s, %s, %s)'] * len(rows))} "
+                        "ON CONFLICT (user_id, ingredient_id) DO UPDATE "
+                        f"SET total_amount = {table}.total_amount "
+                        "+ EXCLUDED.total_amount",
+                        [value for row in rows for value in row],
+                    )
+            for ingredient_id, amount in removed.items():
+                self.filter(
+                    user_id__in=user_ids, ingredient_id=ingredient_id
+                ).update(total_amount=Greatest(F("total_amount") + amount, 0))
+            if removed:
+                self.filter(
+                    user_id__in=user_ids,
+                    ingredient_id__in=removed,
+                    total_amount=0,
+                ).delete()
+
+    def get_ingredient_list(self, user):
+        return (
+            self.filter(user=user)
+            .values(
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                "total_amount",
+            )
+            .order_by("ingredient__name")
+        )
+
+    def get_recipe_amounts(self, recipe):
+        return dict(recipe.recipe.values_list("ingredient_id", "amount"))
+
+    def get_recipes_amounts(self, recipe_ids):
+        recipe_ingredient_model = self.model._meta.apps.get_model(
+            "recipes", "RecipeIngredient"
+        )
+        return dict(
+            recipe_ingredient_model.objects.filter(recipe_id__in=recipe_ids)
+            .values("ingredient_id")
+            .annotate(total_amount=Sum("amount"))
+            .values_list("ingredient_id", "total_amount")
+        )
+
+    def add_recipes(self, user, recipe_ids):
+        if recipe_ids:
+            self.apply_amounts(
+                [user.id], self.get_recipes_amounts(recipe_ids)
+            )
+
+    def remove_recipes(self, user, recipe_ids):
+        if recipe_ids:
+            self.apply_amounts(
+                [user.id],
+                {
+                    ingredient_id: -amount
+                    for ingredient_id, amount in self.get_recipes_amounts(
+                        recipe_ids
+                    ).items()
+                },
+            )
+
+    def add_recipe(self, user, recipe):
+        self.add_recipes(user, [recipe.pk])
+
+    def remove_recipe(self, user, recipe):
+        self.remove_recipes(user, [recipe.pk])
+
+
+class TimelineEntryManager(Manager):
+    def get_recipes(self):
+        return self.model._meta.get_field(
+            "recipe"
+        ).related_model.objects.all()
+
+    def get_pull_author_ids(self, author_ids=None):
+        authors = User.objects.all()
+        if author_ids is not None:
+            authors = authors.filter(pk__in=author_ids)
+        return set(
+            authors.filter(
+                followers_count__gt=settings.FEED_FANOUT_LIMIT
+            ).values_list("pk", flat=True)
+        )
+
+    def trim(self, user_ids):
+        entry_ids = list(
+            self.filter(user_id__in=user_ids)
+            .annotate(
+                position=Window(
+                    expression=RowNumber(),
+                    partition_by=F("user"),
+                    order_by=(F("created").desc(), F("recipe").desc()),
                 )
             )
+            .filter(position__gt=settings.FEED_TIMELINE_SIZE)
+            .values_list("pk", flat=True)
+        )
+        if entry_ids:
+            self.filter(pk__in=entry_ids).delete()
+
+    def fan_out(self, recipe):
+        if self.get_pull_author_ids([recipe.author_id]):
+            return
+        user_ids = list(
+            Following.objects.filter(author_id=recipe.author_id).values_list(
+                "user_id", flat=True
+            )
+        )
+        batch_size = settings.FEED_FANOUT_BATCH_SIZE
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            self.bulk_create(
+                [
+                    self.model(
+                        user_id=user_id,
+                        recipe_id=recipe.pk,
+                        created=recipe.created,
+                    )
+                    for user_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+            self.trim(batch)
+
+    def add_author(self, user_id, author_id):
+        if self.get_pull_author_ids([author_id]):
+            return
+        self.bulk_create(
+            [
+                self.model(
+                    user_id=user_id, recipe_id=recipe_id, created=created
+                )
+                for recipe_id, created in self.get_recipes()
+                .filter(author_id=author_id)
+                .order_by("-created", "-id")
+                .values_list("id", "created")[:settings.FEED_TIMELINE_SIZE]
+            ],
+            ignore_conflicts=True,
+        )
+        self.trim([user_id])
+
+    def remove_author(self, user_id, author_id):
+        self.filter(user_id=user_id, recipe__author_id=author_id).delete()
+
+    def rebuild(self, user_ids):
+        pull_author_ids = self.get_pull_author_ids()
+        with transaction.atomic():
+            self.filter(user_id__in=user_ids).delete()
+            for user_id in user_ids:
+                author_ids = set(
+                    Following.objects.filter(user_id=user_id).values_list(
+                        "author_id", flat=True
+                    )
+                ) - pull_author_ids
+                self.bulk_create(
+                    self.model(
+                        user_id=user_id, recipe_id=recipe_id, created=created
+                    )
+                    for recipe_id, created in self.get_recipes()
+                    .filter(author_id__in=author_ids)
+                    .order_by("-created", "-id")
+                    .values_list("id", "created")[
+                        :settings.FEED_TIMELINE_SIZE
+                    ]
+                )
+
+    def get_feed_filter(self, user):
+        feed_filter = Q(pk__in=self.filter(user=user).values("recipe"))
+        pull_author_ids = self.get_pull_author_ids(
+            Following.objects.filter(user=user).values("author")
+        )
+        if pull_author_ids:
+            feed_filter |= Q(author_id__in=pull_author_ids)
+        return feed_filter
+
+
+class RecipeBucketManager(Manager):
+    def get_recipes(self):
+        return self.model._meta.get_field(
+            "recipe"
+        ).related_model.objects.all()
+
+    def update_recipe(self, recipe_id, ingredient_ids):
+        signature = get_signature(ingredient_ids)
+        self.get_recipes().filter(pk=recipe_id).update(
+            minhash=signature.tobytes()
         )
+        self.filter(recipe_id=recipe_id).delete()
+        self.bulk_create(
+            self.model(recipe_id=recipe_id, band=band, bucket=bucket)
+            for band, bucket in get_buckets(signature)
+        )
+
+    def get_similar(self, recipe, limit, threshold=0):
+        signature = load_signature(recipe.minhash)
+        buckets = get_buckets(signature)
+        if not buckets:
+            return []
+        bucket_filter = Q()
+        for band, bucket in buckets:
+            bucket_filter |= Q(band=band, bucket=bucket)
+        candidates = (
+            self.get_recipes()
+            .filter(pk__in=self.filter(bucket_filter).values("recipe"))
+            .exclude(pk=recipe.pk)
+            .only("id", "name", "image", "cooking_time", "minhash")
+        )
+        similar = []
+        for candidate in candidates:
+            candidate.similarity = get_similarity(
+                signature, load_signature(candidate.minhash)
+            )
+            if candidate.similarity > threshold:
+                similar.append(candidate)
+        similar.sort(key=lambda item: (-item.similarity, item.pk))
+        return similar[:limit]
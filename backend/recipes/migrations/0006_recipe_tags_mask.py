@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:29
+
+from django.db import migrations, models
+
+TAGS_MASK_BITS = 63
+
+
+def fill_tags_mask(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    masks = {}
+    for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+        'recipe_id', 'tag_id'
+    ):
+        if tag_id < TAGS_MASK_BITS:
+            masks[recipe_id] = masks.get(recipe_id, 0) | 1 << tag_id
+    recipes = list(Recipe.objects.filter(id__in=masks).only('id'))
+    for recipe in recipes:
+        recipe.tags_mask = masks[recipe.id]
+    Recipe.objects.bulk_update(recipes, ['tags_mask'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.RunPython(fill_tags_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:53
+
+from array import array
+from hashlib import blake2b
+from random import Random
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+MINHASH_SEED = 20231
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def get_hash_functions():
+    random = Random(MINHASH_SEED)
+    return [
+        (random.randrange(1, MERSENNE_PRIME), random.randrange(MERSENNE_PRIME))
+        for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+    ]
+
+
+def get_signature(ingredient_ids, hash_functions):
+    return array(
+        'q',
+        (
+            min((a * x + b) % MERSENNE_PRIME for x in ingredient_ids)
+            for a, b in hash_functions
+        ),
+    )
+
+
+def get_buckets(signature):
+    return [
+        (
+            band,
+            int.from_bytes(
+                blake2b(
+                    signature[
+                        band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS
+                    ].tobytes(),
+                    digest_size=8,
+                ).digest(),
+                'big',
+                signed=True,
+            ),
+        )
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def fill_minhash(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeBucket = apps.get_model('recipes', 'RecipeBucket')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ingredient_ids = {}
+    for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ):
+        ingredient_ids.setdefault(recipe_id, set()).add(ingredient_id)
+    hash_functions = get_hash_functions()
+    recipes, buckets = [], []
+    for recipe_id, ids in ingredient_ids.items():
+        signature = get_signature(ids, hash_functions)
+        recipes.append(Recipe(pk=recipe_id, minhash=signature.tobytes()))
+        buckets.extend(
+            RecipeBucket(recipe_id=recipe_id, band=band, bucket=bucket)
+            for band, bucket in get_buckets(signature)
+        )
+    Recipe.objects.bulk_update(recipes, ['minhash'], batch_size=1000)
+    RecipeBucket.objects.bulk_create(buckets, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipeneighbour'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='minhash',
+            field=models.BinaryField(default=b'', verbose_name='Сигнатура ингредиентов'),
+        ),
+        migrations.CreateModel(
+            name='RecipeBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Полоса')),
+                ('bucket', models.BigIntegerField(verbose_name='Корзина')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name': 'Корзина LSH',
+                'verbose_name_plural': 'Корзины LSH',
+                'default_related_name': 'bucket',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='recipebucket_band_index')],
+            },
+        ),
+        migrations.RunPython(fill_minhash, migrations.RunPython.noop),
+    ]
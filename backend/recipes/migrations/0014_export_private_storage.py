@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:11
+
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+import recipes.models
+
+
+def delete_public_exports(apps, schema_editor):
+    ShoppingListExport = apps.get_model('recipes', 'ShoppingListExport')
+    for name in ShoppingListExport.objects.exclude(file='').values_list(
+        'file', flat=True
+    ):
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(path):
+            os.remove(path)
+    ShoppingListExport.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_public_exports, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shoppinglistexport',
+            name='file',
+            field=models.FileField(blank=True, storage=recipes.models.get_export_storage, upload_to='exports/', verbose_name='Файл'),
+        ),
+    ]
@@ -1,12 +1,38 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 
+from users.models import DenormalizedFieldsMixin
+from .managers import (
+    FavoriteManager,
+    RecipeBucketManager,
+    RecipeManager,
+    ShoppingCartIngredientManager,
+    ShoppingListManager,
+    TimelineEntryManager,
+)
+
 User = get_user_model()
 
+TAGS_MASK_BITS = 63
+
+
+def get_tags_mask(tag_ids):
+    mask = 0
+    for tag_id in tag_ids:
+        if tag_id < TAGS_MASK_BITS:
+            mask |= 1 << tag_id
+    return mask
+
+
+def get_export_storage():
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
 
-class Recipe(models.Model):
+
+class Recipe(DenormalizedFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -40,11 +66,68 @@ class Recipe(models.Model):
             MaxValueValidator(420),
         ],
     )
+    created = models.DateTimeField(
+        "Дата публикации",
+        auto_now_add=True,
+    )
+    tags_mask = models.BigIntegerField(
+        "Маска тегов",
+        default=0,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        "В избранном",
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        "В корзинах",
+        default=0,
+        editable=False,
+    )
+    trending_score = models.FloatField(
+        "Популярность",
+        default=0,
+        editable=False,
+    )
+    minhash = models.BinaryField(
+        "Сигнатура ингредиентов",
+        default=b"",
+        editable=False,
+    )
+
+    objects = RecipeManager()
+
+    denormalized_fields = (
+        "tags_mask",
+        "favorites_count",
+        "shopping_cart_count",
+        "trending_score",
+        "minhash",
+    )
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
-        ordering = ("name",)
+        ordering = ("name", "id")
+        indexes = [
+            models.Index(
+                fields=["name", "id"],
+                name="recipe_name_index",
+            ),
+            models.Index(
+                fields=["created", "id"],
+                name="recipe_created_index",
+            ),
+            models.Index(
+                fields=["author", "name", "id"],
+                name="recipe_author_name_index",
+            ),
+            models.Index(
+                fields=["-trending_score", "-id"],
+                name="recipe_trending_index",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -101,6 +184,15 @@ class Ingredient(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ("name",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "name",
+                    "measurement_unit",
+                ],
+                name="unique_ingredient",
+            )
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -135,6 +227,12 @@ class RecipeIngredient(models.Model):
                 name="unique_recipeingredient",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["ingredient", "recipe"],
+                name="recipeingredient_reverse_index",
+            )
+        ]
 
 
 class Favorite(models.Model):
@@ -151,6 +249,8 @@ class Favorite(models.Model):
         auto_now_add=True,
     )
 
+    objects = FavoriteManager()
+
     class Meta:
         verbose_name = "Избранное"
         verbose_name_plural = "Избранное"
@@ -165,6 +265,12 @@ class Favorite(models.Model):
                 name="unique_favorite",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["user", "added"],
+                name="favorite_user_added_index",
+            )
+        ]
 
     def __str__(self):
         return f"{self.user} добавил в избранное рецепт {self.recipe}"
@@ -184,6 +290,8 @@ class ShoppingList(models.Model):
         auto_now_add=True,
     )
 
+    objects = ShoppingListManager()
+
     class Meta:
         verbose_name = "КорзинаПокупок"
         verbose_name_plural = "КорзиныПокупок"
@@ -197,3 +305,220 @@ class ShoppingList(models.Model):
                 name="unique_shoppinglist",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["user", "added"],
+                name="shoppinglist_user_added_index",
+            )
+        ]
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+    )
+    total_amount = models.PositiveIntegerField(
+        "Общее количество",
+    )
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        verbose_name = "Ингредиент в корзине"
+        verbose_name_plural = "Ингредиенты в корзине"
+        default_related_name = "shopping_cart_ingredient"
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "user",
+                    "ingredient",
+                ],
+                name="unique_shoppingcartingredient",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.ingredient} {self.total_amount}"
+
+
+class ShoppingListExport(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+    )
+    format = models.CharField(
+        "Формат",
+        max_length=8,
+    )
+    version = models.CharField(
+        "Версия корзины",
+        max_length=40,
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    file = models.FileField(
+        "Файл",
+        upload_to="exports/",
+        storage=get_export_storage,
+        blank=True,
+    )
+    created = models.DateTimeField(
+        "Время создания",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = "Выгрузка корзины"
+        verbose_name_plural = "Выгрузки корзины"
+        ordering = ("-created",)
+        default_related_name = "shopping_list_export"
+        indexes = [
+            models.Index(
+                fields=["user", "format", "version"],
+                name="export_version_index",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.format} {self.status}"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(
+        "Дата публикации",
+    )
+
+    objects = TimelineEntryManager()
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        default_related_name = "timeline"
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "user",
+                    "recipe",
+                ],
+                name="unique_timelineentry",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created", "-recipe"],
+                name="timeline_user_created_index",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.recipe}"
+
+
+class RecipeNeighbour(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="neighbours",
+    )
+    neighbour = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    score = models.FloatField(
+        "Сходство",
+    )
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        ordering = ("-score",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "recipe",
+                    "neighbour",
+                ],
+                name="unique_recipeneighbour",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "-score"],
+                name="neighbour_recipe_score_index",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} -> {self.neighbour}: {self.score:.3f}"
+
+
+class RecipeBucket(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+    )
+    band = models.PositiveSmallIntegerField(
+        "Полоса",
+    )
+    bucket = models.BigIntegerField(
+        "Корзина",
+    )
+
+    objects = RecipeBucketManager()
+
+    class Meta:
+        verbose_name = "Корзина LSH"
+        verbose_name_plural = "Корзины LSH"
+        default_related_name = "bucket"
+        indexes = [
+            models.Index(
+                fields=["band", "bucket"],
+                name="recipebucket_band_index",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe}: {self.band}/{self.bucket}"
+
+
+class Version(models.Model):
+    name = models.CharField(
+        "Название",
+        max_length=150,
+        unique=True,
+    )
+    token = models.CharField(
+        "Значение",
+        max_length=32,
+    )
+
+    class Meta:
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+
+    def __str__(self):
+        return f"{self.name}: {self.token}"
@@ -0,0 +1,66 @@
+from array import array
+
+import numpy as np
+from scipy import sparse
+
+from .models import Favorite, ShoppingList
+
+
+class InteractionMatrix:
+    def __init__(self):
+        self.recipe_ids = np.empty(0, dtype=np.int64)
+        self.items = sparse.csr_matrix((0, 0))
+        self.users = sparse.csr_matrix((0, 0))
+        self.norms = np.empty(0)
+
+    def get_interactions(self):
+        return (
+            Favorite.objects.order_by()
+            .values_list("user_id", "recipe_id")
+            .union(
+                ShoppingList.objects.order_by().values_list(
+                    "user_id", "recipe_id"
+                )
+            )
+            .order_by("user_id", "recipe_id")
+        )
+
+    def build(self, chunk_size=10000):
+        pairs = array("q")
+        for user_id, recipe_id in self.get_interactions().iterator(
+            chunk_size=chunk_size
+        ):
+            pairs.append(user_id)
+            pairs.append(recipe_id)
+        pairs = np.frombuffer(pairs, dtype=np.int64).reshape(-1, 2)
+        user_ids, users = np.unique(pairs[:, 0], return_inverse=True)
+        self.recipe_ids, items = np.unique(pairs[:, 1], return_inverse=True)
+        self.items = sparse.csr_matrix(
+            (np.ones(len(pairs)), (items, users)),
+            shape=(len(self.recipe_ids), len(user_ids)),
+        )
+        self.users = self.items.T.tocsr()
+        self.norms = np.sqrt(np.diff(self.items.indptr))
+
+    @property
+    def interactions(self):
+        return self.items.nnz
+
+    def get_neighbours(self, start, stop, top_k):
+        shared = (self.items[start:stop] @ self.users).tocsr()
+        rows = np.repeat(np.arange(stop - start), np.diff(shared.indptr))
+        shared.data[shared.indices == rows + start] = 0
+        shared.eliminate_zeros()
+        counts = np.diff(shared.indptr)
+        rows = np.repeat(np.arange(stop - start), counts)
+        scores = shared.data / (
+            self.norms[rows + start] * self.norms[shared.indices]
+        )
+        order = np.lexsort((-shared.indices, -scores, rows))
+        ranks = np.arange(len(order)) - np.repeat(shared.indptr[:-1], counts)
+        order = order[ranks < top_k]
+        return (
+            self.recipe_ids[rows[order] + start],
+            self.recipe_ids[shared.indices[order]],
+            scores[order],
+        )
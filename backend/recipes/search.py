@@ -0,0 +1,212 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict, namedtuple
+from threading import Lock
+
+from django.conf import settings
+
+from .models import Ingredient, RecipeIngredient
+from .versions import bump_version, get_version, replace_version
+
+IndexState = namedtuple(
+    "IndexState",
+    (
+        "version",
+        "keys",
+        "positions",
+        "ingredients",
+        "names",
+        "grams",
+        "sizes",
+    ),
+)
+
+
+def get_ingredient_version():
+    return get_version("ingredients")
+
+
+def bump_ingredient_version():
+    bump_version("ingredients")
+
+
+def get_grams(value, size):
+    return {value[i:i + size] for i in range(len(value) - size + 1)}
+
+
+def get_trigrams(value):
+    return get_grams(f"  {value} ", 3)
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.lock = Lock()
+        self.state = IndexState(None, [], [], [], [], {}, [])
+
+    def build(self, version):
+        ingredients = list(Ingredient.objects.all())
+        names = [ingredient.name.casefold() for ingredient in ingredients]
+        entries = sorted(
+            (name, position) for position, name in enumerate(names)
+        )
+        grams = defaultdict(list)
+        for position, name in enumerate(names):
+            for gram in get_grams(name, 2) | get_trigrams(name):
+                grams[gram].append(position)
+        return IndexState(
+            version,
+            [key for key, _ in entries],
+            [position for _, position in entries],
+            ingredients,
+            names,
+            dict(grams),
+            [len(get_trigrams(name)) for name in names],
+        )
+
+    def get_state(self):
+        version = get_ingredient_version()
+        if self.state.version != version:
+            with self.lock:
+                if self.state.version != version:
+                    self.state = self.build(version)
+        return self.state
+
+    def get_prefix_positions(self, state, prefix):
+        start = bisect_left(state.keys, prefix)
+        end = bisect_left(state.keys, prefix + chr(0x10FFFF), start)
+        return sorted(state.positions[start:end])
+
+    def startswith(self, prefix):
+        state = self.get_state()
+        return [
+            state.ingredients[position]
+            for position in self.get_prefix_positions(state, prefix.casefold())
+        ]
+
+    def get_substring_positions(self, state, query):
+        grams = get_grams(query, 3 if len(query) >= 3 else 2)
+        if not grams:
+            return []
+        candidates = None
+        for gram in grams:
+            postings = set(state.grams.get(gram, ()))
+            candidates = (
+                postings if candidates is None else candidates & postings
+            )
+            if not candidates:
+                return []
+        return sorted(
+            position for position in candidates
+            if query in state.names[position]
+        )
+
+    def get_similar_positions(self, state, query):
+        trigrams = get_trigrams(query)
+        shared = defaultdict(int)
+        for gram in trigrams:
+            for position in state.grams.get(gram, ()):
+                shared[position] += 1
+        scored = []
+        for position, count in shared.items():
+            score = count / (len(trigrams) + state.sizes[position] - count)
+            if score >= settings.INGREDIENT_SIMILARITY_THRESHOLD:
+                scored.append((-score, position))
+        return [position for _, position in sorted(scored)]
+
+    def search(self, query, limit=None):
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        state = self.get_state()
+        query = query.casefold()
+        result = []
+        seen = set()
+        for positions in (
+            self.get_prefix_positions,
+            self.get_substring_positions,
+            self.get_similar_positions,
+        ):
+            for position in positions(state, query):
+                if position in seen:
+                    continue
+                seen.add(position)
+                result.append(state.ingredients[position])
+                if len(result) >= limit:
+                    return result
+        return result
+
+
+ingredient_index = IngredientIndex()
+
+
+class RecipeIngredientIndex:
+    version_name = "recipe_ingredients"
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.postings = {}
+        self.sizes = {}
+
+    def build(self):
+        postings = defaultdict(lambda: array("q"))
+        sizes = Counter()
+        for ingredient_id, recipe_id in (
+            RecipeIngredient.objects.order_by("ingredient_id", "recipe_id")
+            .values_list("ingredient_id", "recipe_id")
+            .iterator()
+        ):
+            postings[ingredient_id].append(recipe_id)
+            sizes[recipe_id] += 1
+        self.postings = dict(postings)
+        self.sizes = dict(sizes)
+
+    def refresh(self):
+        version = get_version(self.version_name)
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.build()
+                    self.version = version
+
+    def update(self, recipe_id, old_ingredient_ids, new_ingredient_ids):
+        with self.lock:
+            version = replace_version(self.version_name, self.version)
+            if version is None:
+                bump_version(self.version_name)
+                self.version = None
+                return
+            for ingredient_id in old_ingredient_ids - new_ingredient_ids:
+                postings = self.postings.get(ingredient_id)
+                if postings is None:
+                    continue
+                position = bisect_left(postings, recipe_id)
+                if (
+                    position < len(postings)
+                    and postings[position] == recipe_id
+                ):
+                    postings.pop(position)
+            for ingredient_id in new_ingredient_ids - old_ingredient_ids:
+                insort(
+                    self.postings.setdefault(ingredient_id, array("q")),
+                    recipe_id,
+                )
+            if new_ingredient_ids:
+                self.sizes[recipe_id] = len(new_ingredient_ids)
+            else:
+                self.sizes.pop(recipe_id, None)
+            self.version = version
+
+    def search(self, ingredient_ids):
+        self.refresh()
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(self.postings.get(ingredient_id, ()))
+        return sorted(
+            (
+                (recipe_id, count, self.sizes.get(recipe_id, count) - count)
+                for recipe_id, count in matched.items()
+            ),
+            key=lambda item: (-item[1], item[2], -item[0]),
+        )
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,184 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.db import transaction
+from django.dispatch import Signal, receiver
+
+from users.models import Following
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeBucket,
+    ShoppingCartIngredient,
+    ShoppingList,
+    TimelineEntry,
+    get_tags_mask,
+)
+from .fulltext import delete_search_index, update_search_index
+from .search import bump_ingredient_version, recipe_ingredient_index
+from .versions import bump_version
+
+User = get_user_model()
+
+recipe_ingredients_changed = Signal()
+recipe_tags_changed = Signal()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_ingredient_version()
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_shopping_carts(instance, old_amounts, new_amounts, **kwargs):
+    ShoppingCartIngredient.objects.apply_amounts(
+        list(instance.shopping_list.values_list("user_id", flat=True)),
+        {
+            ingredient_id: (
+                new_amounts.get(ingredient_id, 0)
+                - old_amounts.get(ingredient_id, 0)
+            )
+            for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        },
+    )
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_recipe_ingredient_index(
+    instance, old_amounts, new_amounts, **kwargs
+):
+    recipe_id = instance.pk
+    old_ingredient_ids = set(old_amounts)
+    new_ingredient_ids = set(new_amounts)
+    transaction.on_commit(
+        lambda: recipe_ingredient_index.update(
+            recipe_id, old_ingredient_ids, new_ingredient_ids
+        )
+    )
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def update_recipe_buckets(instance, old_amounts, new_amounts, **kwargs):
+    if new_amounts.keys() != old_amounts.keys():
+        RecipeBucket.objects.update_recipe(instance.pk, set(new_amounts))
+
+
+@receiver(recipe_tags_changed, sender=Recipe)
+def bump_recipes_version(instance, **kwargs):
+    bump_version("recipes")
+    bump_recipe_version(instance.pk)
+
+
+def bump_recipe_version(recipe_id):
+    transaction.on_commit(
+        lambda: bump_version("recipe_list", f"recipe:{recipe_id}")
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tags_mask(instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif pk_set is not None:
+        recipe_ids = list(pk_set)
+    else:
+        recipe_ids = None
+    through = Recipe.tags.through.objects.all()
+    recipes = Recipe.objects.all()
+    if recipe_ids is not None:
+        through = through.filter(recipe_id__in=recipe_ids)
+        recipes = recipes.filter(id__in=recipe_ids)
+    tag_ids = {}
+    for recipe_id, tag_id in through.values_list("recipe_id", "tag_id"):
+        tag_ids.setdefault(recipe_id, []).append(tag_id)
+    recipes = list(recipes.only("id", "tags_mask"))
+    for recipe in recipes:
+        recipe.tags_mask = get_tags_mask(tag_ids.get(recipe.id, []))
+    Recipe.objects.bulk_update(recipes, ["tags_mask"])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, using, **kwargs):
+    update_search_index(instance, using)
+    bump_recipe_version(instance.pk)
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F("recipes_count") + 1
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    recipe_ingredients_changed.send(
+        sender=Recipe,
+        instance=instance,
+        old_amounts=ShoppingCartIngredient.objects.get_recipe_amounts(
+            instance
+        ),
+        new_amounts={},
+    )
+    recipe_tags_changed.send(
+        sender=Recipe,
+        instance=instance,
+        added=set(),
+        removed=set(instance.tags.values_list("id", flat=True)),
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, using, **kwargs):
+    delete_search_index(instance.pk, using)
+    bump_recipe_version(instance.pk)
+    User.objects.filter(pk=instance.author_id).update(
+        recipes_count=Greatest(F("recipes_count") - 1, 0)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def push_to_timelines(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: TimelineEntry.objects.fan_out(instance))
+
+
+@receiver(post_save, sender=Following)
+def following_created(instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            followers_count=F("followers_count") + 1
+        )
+        transaction.on_commit(
+            lambda: TimelineEntry.objects.add_author(
+                instance.user_id, instance.author_id
+            )
+        )
+
+
+@receiver(post_delete, sender=Following)
+def following_deleted(instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).update(
+        followers_count=Greatest(F("followers_count") - 1, 0)
+    )
+    TimelineEntry.objects.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(instance, **kwargs):
+    for model in (Favorite, ShoppingList):
+        model.objects.update_counters(
+            list(
+                model.objects.filter(user=instance).values_list(
+                    "recipe_id", flat=True
+                )
+            ),
+            -1,
+        )
@@ -0,0 +1,59 @@
+from array import array
+from hashlib import blake2b
+from random import Random
+
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+MINHASH_SEED = 20231
+MERSENNE_PRIME = (1 << 61) - 1
+
+_random = Random(MINHASH_SEED)
+HASH_FUNCTIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(MERSENNE_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+
+def get_signature(ingredient_ids):
+    if not ingredient_ids:
+        return array("q")
+    return array(
+        "q",
+        (
+            min((a * x + b) % MERSENNE_PRIME for x in ingredient_ids)
+            for a, b in HASH_FUNCTIONS
+        ),
+    )
+
+
+def load_signature(data):
+    signature = array("q")
+    signature.frombytes(bytes(data))
+    return signature
+
+
+def get_buckets(signature):
+    if not signature:
+        return []
+    return [
+        (
+            band,
+            int.from_bytes(
+                blake2b(
+                    signature[
+                        band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS
+                    ].tobytes(),
+                    digest_size=8,
+                ).digest(),
+                "big",
+                signed=True,
+            ),
+        )
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def get_similarity(signature, other):
+    if not signature or len(signature) != len(other):
+        return 0
+    return sum(x == y for x, y in zip(signature, other)) / len(signature)
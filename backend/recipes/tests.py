@@ -0,0 +1,208 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import RecipeViewSet
+from users.models import Following
+from .models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeBucket,
+    RecipeIngredient,
+    RecipeNeighbour,
+    ShoppingCartIngredient,
+    ShoppingList,
+    TimelineEntry,
+)
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(
+    r"\bSCAN \w+(?! USING (COVERING )?INDEX)\s*$", re.MULTILINE
+)
+
+
+class HotQueryIndexTest(TestCase):
+    users_count = 200
+    recipes_count = 5000
+    ingredients_count = 1000
+    ingredients_per_recipe = 5
+    interactions_per_user = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(
+                email=f"user{number}@example.com",
+                username=f"user{number}",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for number in range(cls.users_count)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(cls.ingredients_count)
+        )
+        now = timezone.now()
+        cls.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.users[number % cls.users_count],
+                name=f"Рецепт {number}",
+                image="recipes/image.png",
+                text="Описание",
+                cooking_time=10,
+                created=now - timedelta(minutes=number),
+                trending_score=number % 7,
+            )
+            for number in range(cls.recipes_count)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=cls.ingredients[
+                    (number * 7 + offset) % cls.ingredients_count
+                ],
+                amount=offset + 1,
+            )
+            for number, recipe in enumerate(cls.recipes)
+            for offset in range(cls.ingredients_per_recipe)
+        )
+        pairs = [
+            (user, cls.recipes[(number * 31 + offset) % cls.recipes_count])
+            for number, user in enumerate(cls.users)
+            for offset in range(cls.interactions_per_user)
+        ]
+        Favorite.objects.bulk_create(
+            Favorite(user=user, recipe=recipe) for user, recipe in pairs
+        )
+        ShoppingList.objects.bulk_create(
+            ShoppingList(user=user, recipe=recipe) for user, recipe in pairs
+        )
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user=user, recipe=recipe, created=recipe.created)
+            for user, recipe in pairs
+        )
+        ShoppingCartIngredient.objects.bulk_create(
+            ShoppingCartIngredient(
+                user=user,
+                ingredient=cls.ingredients[
+                    (number * 13 + offset) % cls.ingredients_count
+                ],
+                total_amount=offset + 1,
+            )
+            for number, user in enumerate(cls.users)
+            for offset in range(cls.interactions_per_user)
+        )
+        Following.objects.bulk_create(
+            Following(
+                user=user,
+                author=cls.users[(number + offset) % cls.users_count],
+            )
+            for number, user in enumerate(cls.users)
+            for offset in range(1, 11)
+        )
+        RecipeNeighbour.objects.bulk_create(
+            RecipeNeighbour(
+                recipe=recipe,
+                neighbour=cls.recipes[(number + offset) % cls.recipes_count],
+                score=1 / offset,
+            )
+            for number, recipe in enumerate(cls.recipes)
+            for offset in range(1, 6)
+        )
+        RecipeBucket.objects.bulk_create(
+            RecipeBucket(recipe=recipe, band=band, bucket=number % 500)
+            for number, recipe in enumerate(cls.recipes)
+            for band in range(4)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assert_uses_index(self, queryset):
+        plan = queryset.explain()
+        if connection.vendor == "postgresql":
+            self.assertNotIn("Seq Scan", plan, plan)
+            self.assertIn("Index", plan, plan)
+            return
+        self.assertNotRegex(plan, FULL_SCAN, plan)
+        self.assertNotIn("TEMP B-TREE", plan, plan)
+        self.assertRegex(plan, r"USING (COVERING )?INDEX", plan)
+
+    def get_view_queryset(self, action, user=None, **params):
+        request = APIRequestFactory().get("/api/recipes/", params)
+        if user is not None:
+            force_authenticate(request, user)
+        view = RecipeViewSet(
+            action_map={"get": action}, args=(), kwargs={}, format_kwarg=None
+        )
+        view.request = view.initialize_request(request)
+        return view.filter_queryset(view.get_queryset()), view
+
+    def get_list_page(self, user=None, page=1, **params):
+        queryset, view = self.get_view_queryset(
+            "list", user, limit=6, page=page, **params
+        )
+        limit = view.paginator.get_page_size(view.request)
+        return queryset[(page - 1) * limit:page * limit]
+
+    def test_recipe_list_queries_use_indexes(self):
+        user = self.users[7]
+        recipe = self.recipes[self.recipes_count // 2]
+        cursor_queryset, _ = self.get_view_queryset("list", user)
+        trending_queryset, _ = self.get_view_queryset("trending", user)
+        queries = {
+            "anonymous": self.get_list_page(),
+            "authenticated": self.get_list_page(user),
+            "next_page": self.get_list_page(user, page=3),
+            "author": self.get_list_page(user, author=self.users[3].id),
+            "cursor": (
+                cursor_queryset.filter(created__lte=recipe.created)
+                .exclude(created=recipe.created, id__gte=recipe.id)
+                .order_by("-created", "-id")[:7]
+            ),
+            "trending": (
+                trending_queryset.filter(trending_score__gt=0)
+                .order_by("-trending_score", "-id")[:6]
+            ),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                self.assert_uses_index(queryset)
+
+    def test_hot_queries_use_indexes(self):
+        user = self.users[7]
+        recipe = self.recipes[self.recipes_count // 2]
+        queries = {
+            "recipe_ingredients": RecipeIngredient.objects.filter(
+                recipe=recipe
+            ),
+            "ingredient_recipes": RecipeIngredient.objects.filter(
+                ingredient=self.ingredients[3]
+            ).values("recipe"),
+            "favorites": Favorite.objects.filter(user=user).order_by(
+                "-added"
+            ),
+            "shopping_list": ShoppingList.objects.filter(user=user).order_by(
+                "-added"
+            ),
+            "shopping_cart": ShoppingCartIngredient.objects.filter(user=user),
+            "timeline": (
+                TimelineEntry.objects.filter(user=user)
+                .order_by("-created", "-recipe_id")[:6]
+            ),
+            "subscriptions": Following.objects.filter(user=user),
+            "neighbours": RecipeNeighbour.objects.filter(
+                recipe=recipe
+            ).order_by("-score")[:10],
+            "buckets": RecipeBucket.objects.filter(band=1, bucket=42),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                self.assert_uses_index(queryset)
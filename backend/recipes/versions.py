@@ -0,0 +1,66 @@
+from uuid import uuid4
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "version:{}"
+INITIAL_VERSION = "0"
+
+
+def get_version_model():
+    return apps.get_model("recipes", "Version")
+
+
+def load_version(name):
+    version = (
+        get_version_model()
+        .objects.filter(name=name)
+        .values_list("token", flat=True)
+        .first()
+    )
+    return version or INITIAL_VERSION
+
+
+def get_version(name):
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        version = load_version(name)
+        cache.set(key, version, settings.VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def set_cached_versions(names, version):
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {VERSION_KEY.format(name): version for name in names},
+            settings.VERSION_CACHE_TIMEOUT,
+        )
+    )
+
+
+def bump_version(*names):
+    version = uuid4().hex
+    version_model = get_version_model()
+    version_model.objects.bulk_create(
+        [version_model(name=name, token=version) for name in names],
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=["token"],
+    )
+    set_cached_versions(names, version)
+    return version
+
+
+def replace_version(name, expected):
+    version = uuid4().hex
+    if not (
+        get_version_model()
+        .objects.filter(name=name, token=expected)
+        .update(token=version)
+    ):
+        return None
+    set_cached_versions([name], version)
+    return version
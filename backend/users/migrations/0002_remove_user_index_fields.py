@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='foodgramuser',
+            name='user_index_fields',
+        ),
+    ]
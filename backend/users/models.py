@@ -2,7 +2,26 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
-class FoodgramUser(AbstractUser):
+class DenormalizedFieldsMixin:
+    denormalized_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class FoodgramUser(DenormalizedFieldsMixin, AbstractUser):
 
     email = models.EmailField(
         "Электронная почта",
@@ -17,18 +36,24 @@ class FoodgramUser(AbstractUser):
         "Фамилия",
         max_length=100,
     )
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков",
+        default=0,
+        editable=False,
+    )
+    recipes_count = models.PositiveIntegerField(
+        "Количество рецептов",
+        default=0,
+        editable=False,
+    )
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
 
+    denormalized_fields = ("followers_count", "recipes_count")
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
-        indexes = [
-            models.Index(
-                fields=["first_name", "last_name"],
-                name="user_index_fields",
-            )
-        ]
 
 
 class Following(models.Model):